@@ -40,9 +40,9 @@ else
     echo "Specified dataset already exists"
 fi
 
-echo "Convert tfrecord to gzip files"
+echo "Convert tfrecord to zstd files"
 
-# Convert tfrecords to gzip files
+# Convert tfrecords to zstd files
 python3 ./examples/convert_scene_dataset.py --dataset ${DATASET_NAME} \
     --mode train --first-n -1 --batch-size 500
 
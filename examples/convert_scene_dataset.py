@@ -1,18 +1,18 @@
 
-"""Convert tfrecords to gziped files.
+"""Convert tfrecords to zstd compressed files.
 
-This file converts tfrecords in deepmind gqn dataset to gzip files. Each
-tfrecord will be converted to multiple gzip files which contains a list of
-tuples `(images, poses)`.
+This file converts tfrecords in deepmind gqn dataset to zstd files. Each
+tfrecord will be converted to multiple zstd compressed npz files which
+contain stacked arrays `images` and `viewpoints`.
 
 For example, when converting `shepard_metzler_5_parts` dataset with batch size
 of `100`, a single tfrecord file which contains `2000` sequences is converted
-to `20` gzip files which contain a list of `100` tuples.
+to `20` zstd files which contain `100` sequences.
 
-ex) 900-of-900.tfrecord -> 900-of-900-1.pt.gz, ..., 900-of-900-20.pt.gz
+ex) 900-of-900.tfrecord -> 900-of-900-1.npz.zst, ..., 900-of-900-20.npz.zst
 
-Images size: `(sequence, height, width, channel)`.
-Viewpoints size: `(sequence, v_dim)`
+Images size: `(batch, sequence, channel, height, width)`, uint8.
+Viewpoints size: `(batch, sequence, 7)`
 
 (Dataset)
 
@@ -31,16 +31,32 @@ https://github.com/iShohei220/torch-gqn/blob/master/dataset/convert2torch.py
 https://github.com/musyoku/gqn-datasets-translator/blob/master/convert.py
 """
 
+from typing import Callable
+
 import argparse
 import collections
+import concurrent.futures
 import functools
-import gzip
+import io
 import multiprocessing as mp
 import os
 import pathlib
 
+import cv2
+import numpy as np
 import tensorflow as tf
 import torch
+from torch.nn import functional as F
+import torchvision
+import tqdm
+from turbojpeg import TurboJPEG, TJPF_RGB
+import zstandard as zstd
+
+import gqnlib
+
+# Tensorflow only reads records, so hide GPUs from it before any op runs.
+# Otherwise it reserves most of GPU memory which nvJPEG needs with `--cuda`.
+tf.config.set_visible_devices([], "GPU")
 
 
 DatasetInfo = collections.namedtuple(
@@ -101,11 +117,15 @@ _DATASETS = dict(
 )
 _NUM_CHANNELS = 3
 _NUM_RAW_CAMERA_PARAMS = 5
+_NUM_CUDA_PROC = 2
+
+# JPEG decoder by libjpeg-turbo, which loads shared library at first use
+_TJ = None
 
 
 def convert_record(path: pathlib.Path, dataset_name: str,
-                   save_dir: pathlib.Path, batch_size: int, first_n: int
-                   ) -> None:
+                   save_dir: pathlib.Path, batch_size: int, first_n: int,
+                   cuda: bool = False) -> None:
     """Main process for one tfrecord file.
 
     This method load one tfrecord file, and preprocess each (frames, cameras)
@@ -117,92 +137,167 @@ def convert_record(path: pathlib.Path, dataset_name: str,
         save_dir (pathlib.Path): Path to saved data.
         batch_size (int): Batch size of dataset for each tfrecord.
         first_n (int): Number of data to read (-1 means all).
+        cuda (bool, optional): If `True`, decode jpeg images on GPU.
     """
 
     # Dataset info
     dataset_info = _DATASETS[dataset_name]
 
-    # Load tfrecord
-    dataset = tf.data.TFRecordDataset(str(path))
+    # Frames are resized only if original size is not 64x64
+    if cuda:
+        preprocess_frames = _preprocess_frames_cuda
+    elif dataset_info.frame_size == 64:
+        preprocess_frames = _preprocess_frames_64
+    else:
+        preprocess_frames = _preprocess_frames_resize
+
+    preprocess = functools.partial(
+        _preprocess_data, preprocess_frames=preprocess_frames,
+        sequence_size=dataset_info.sequence_size)
+
+    # Load tfrecord as serialized bytes
+    dataset = tf.data.TFRecordDataset(str(path)).take(first_n)
 
-    # Preprocess for each data and save to gzip file
+    # Preprocess for each data and save to zstd file. Files are compressed
+    # and written in background thread while the next batch is decoded.
     scene_list = []
     batch = 1
-    for i, raw_data in enumerate(dataset.take(first_n)):
-        scene_list.append(_preprocess_data(dataset_info, raw_data))
+    future = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        for i, raw_data in enumerate(dataset.as_numpy_iterator()):
+            try:
+                scene_list.append(preprocess(raw_data))
+            except ValueError as e:
+                raise ValueError(f"Invalid record {i} in {path}: {e}") from e
 
-        # Save batch to a single file
-        if (i + 1) % batch_size == 0:
-            save_path = save_dir / f"{path.stem}-{batch}.pt.gz"
-            with gzip.open(str(save_path), "wb") as f:
-                torch.save(scene_list, f)
+            # Save batch to a single file
+            if (i + 1) % batch_size == 0:
+                # Wait for previous batch to bound memory usage
+                if future is not None:
+                    future.result()
 
-            scene_list = []
-            batch += 1
-    else:
-        # Save rest
-        if scene_list:
-            save_path = save_dir / f"{path.stem}-{batch}.pt.gz"
-            with gzip.open(str(save_path), "wb") as f:
-                torch.save(scene_list, f)
+                save_path = save_dir / f"{path.stem}-{batch}.npz.zst"
+                future = executor.submit(_save_scenes, scene_list, save_path)
+
+                scene_list = []
+                batch += 1
+        else:
+            # Save rest
+            if scene_list:
+                save_path = save_dir / f"{path.stem}-{batch}.npz.zst"
+                _save_scenes(scene_list, save_path)
+
+        if future is not None:
+            future.result()
 
 
-def _preprocess_data(dataset_info: DatasetInfo, raw_data: tf.Tensor):
-    """Converts raw data to tensor and saves into torch gziped file.
+def _save_scenes(scene_list: list, save_path: pathlib.Path) -> None:
+    """Saves list of scenes to zstd compressed npz file.
+
+    Scenes are stacked into single arrays, so that the loader does not need
+    to stack each sequence nor unpickle python objects.
 
     Args:
-        dataset_info (DatasetInfo): Information tuple.
-        raw_data (tf.Tensor): Tensor of original data.
+        scene_list (list): List of tuples `(frames, cameras)`.
+        save_path (pathlib.Path): Path to saved file.
     """
 
-    feature_map = {
-        'frames': tf.io.FixedLenFeature(
-            shape=dataset_info.sequence_size, dtype=tf.string),
-        'cameras': tf.io.FixedLenFeature(
-            shape=dataset_info.sequence_size * _NUM_RAW_CAMERA_PARAMS,
-            dtype=tf.float32),
-    }
-    example = tf.io.parse_single_example(raw_data, feature_map)
-    frames = _preprocess_frames(dataset_info, example)
-    cameras = _preprocess_cameras(dataset_info, example)
-
-    return frames.numpy().squeeze(), cameras.numpy().squeeze()
-
-
-def _convert_frame_data(jpeg_data):
-    decoded_frames = tf.image.decode_jpeg(jpeg_data)
-    return tf.image.convert_image_dtype(decoded_frames, dtype=tf.float32)
-
-
-def _preprocess_frames(dataset_info, example):
-    frames = tf.concat(example["frames"], axis=0)
-    frames = tf.nest.map_structure(
-        tf.stop_gradient,
-        tf.map_fn(_convert_frame_data, tf.reshape(frames, [-1]),
-                  dtype=tf.float32)
-    )
-    dataset_image_dimensions = tuple(
-        [dataset_info.frame_size] * 2 + [_NUM_CHANNELS])
-    frames = tf.reshape(
-        frames, (-1, dataset_info.sequence_size) + dataset_image_dimensions)
+    frames, cameras = zip(*scene_list)
 
-    # Squeeze images to 64x64
-    if dataset_info.frame_size != 64:
-        frames = tf.reshape(frames, (-1,) + dataset_image_dimensions)
-        new_frame_dimensions = (64,) * 2 + (_NUM_CHANNELS,)
-        frames = tf.image.resize(frames, new_frame_dimensions[:2])
-        frames = tf.reshape(
-            frames, (-1, dataset_info.sequence_size) + new_frame_dimensions)
+    buf = io.BytesIO()
+    np.savez(buf, images=np.stack(frames), viewpoints=np.stack(cameras))
+
+    with save_path.open("wb") as f:
+        f.write(zstd.ZstdCompressor(level=3).compress(buf.getvalue()))
+
+
+def _preprocess_data(raw_data: bytes, preprocess_frames: Callable,
+                     sequence_size: int) -> tuple:
+    """Converts serialized example to numpy arrays.
 
-    return frames
+    Serialized example is parsed as a protocol buffer, so that no tensorflow
+    op is dispatched for each data.
+
+    Args:
+        raw_data (bytes): Serialized `tf.train.Example` of original data.
+        preprocess_frames (callable): Function which decodes jpeg frames.
+        sequence_size (int): Expected sequence length of data.
+
+    Returns:
+        data (tuple of np.ndarray): Tuple of `(frames, cameras)`.
+
+    Raises:
+        ValueError: If lengths of frames or cameras do not match
+            `sequence_size`.
+    """
 
+    feature = tf.train.Example.FromString(raw_data).features.feature
+    bytes_list = feature["frames"].bytes_list
+    float_list = feature["cameras"].float_list
 
-def _preprocess_cameras(dataset_info, example):
-    raw_pose_params = example["cameras"]
-    cameras = tf.reshape(
-        raw_pose_params,
-        [-1, dataset_info.sequence_size, _NUM_RAW_CAMERA_PARAMS])
-    return cameras
+    if (len(bytes_list.value) != sequence_size
+            or len(float_list.value)
+            != sequence_size * _NUM_RAW_CAMERA_PARAMS):
+        raise ValueError(
+            f"Expected {sequence_size} frames and cameras, but given "
+            f"{len(bytes_list.value)} frames and "
+            f"{len(float_list.value)} camera params.")
+
+    frames = preprocess_frames(bytes_list)
+
+    # Transform cameras: (x, y, z, yaw, pitch)
+    #   -> (x, y, z, cos(yaw), sin(yaw), cos(pitch), sin(pitch))
+    cameras = np.asarray(float_list.value, dtype=np.float32)
+    cameras = cameras.reshape(-1, _NUM_RAW_CAMERA_PARAMS)
+    cameras = gqnlib.transform_viewpoint(torch.from_numpy(cameras)).numpy()
+
+    return frames, cameras
+
+
+def _get_turbojpeg() -> TurboJPEG:
+    global _TJ
+    if _TJ is None:
+        _TJ = TurboJPEG()
+    return _TJ
+
+
+def _preprocess_frames_64(bytes_list):
+    # Decode jpeg images: (sequence, 64, 64, channel)
+    tj = _get_turbojpeg()
+    frames = np.stack([tj.decode(buf, pixel_format=TJPF_RGB)
+                       for buf in bytes_list.value])
+
+    # Convert data size: (sequence, h, w, c) -> (sequence, c, h, w)
+    return np.ascontiguousarray(frames.transpose(0, 3, 1, 2))
+
+
+def _preprocess_frames_resize(bytes_list):
+    # Decode jpeg images and squeeze them to 64x64
+    tj = _get_turbojpeg()
+    frames = np.stack([
+        cv2.resize(tj.decode(buf, pixel_format=TJPF_RGB), (64, 64),
+                   interpolation=cv2.INTER_LINEAR)
+        for buf in bytes_list.value])
+
+    # Convert data size: (sequence, h, w, c) -> (sequence, c, h, w)
+    return np.ascontiguousarray(frames.transpose(0, 3, 1, 2))
+
+
+def _preprocess_frames_cuda(bytes_list):
+    # Decode jpeg images in batch by nvJPEG: (sequence, channel, h, w)
+    buf_list = [torch.frombuffer(bytearray(buf), dtype=torch.uint8)
+                for buf in bytes_list.value]
+    frames = torchvision.io.decode_jpeg(
+        buf_list, mode=torchvision.io.ImageReadMode.RGB, device="cuda")
+    frames = torch.stack(frames)
+
+    # Squeeze images to 64x64
+    if frames.size(-1) != 64:
+        frames = F.interpolate(frames.float(), size=(64, 64),
+                               mode="bilinear", align_corners=False)
+        frames = frames.round_().clamp_(0, 255).to(torch.uint8)
+
+    return frames.cpu().numpy()
 
 
 def main():
@@ -218,12 +313,21 @@ def main():
     parser.add_argument("--first-n", type=int, default=10,
                         help="Read only first n data in single a record "
                              "(-1 means all data).")
+    parser.add_argument("--cuda", action="store_true",
+                        help="Decode jpeg images on GPU (requires "
+                             "torch >= 2.4 and torchvision >= 0.19).")
+    parser.add_argument("--num-proc", type=int, default=-1,
+                        help="Number of processes (-1 means number of CPUs, "
+                             f"or {_NUM_CUDA_PROC} with --cuda).")
     args = parser.parse_args()
 
     if args.dataset not in _DATASETS:
         raise ValueError(f"Unrecognized dataset name {args.dataset}. ",
                          f"Available datasets are {_DATASETS.keys()}.")
 
+    if args.cuda and not torch.cuda.is_available():
+        raise ValueError("CUDA is not available for decoding.")
+
     # Path
     root = pathlib.Path(os.getenv("DATA_DIR", "./data/"))
     tf_dir = root / f"{args.dataset}/{args.mode}/"
@@ -236,13 +340,27 @@ def main():
     # File list of original dataset
     record_list = sorted(tf_dir.glob("*.tfrecord"))
 
-    # Multi process
-    num_proc = mp.cpu_count()
-    with mp.Pool(processes=num_proc) as pool:
+    # Multi process, CUDA cannot be re-initialized in forked process. Each
+    # process holds its own CUDA context, so fewer processes are used on GPU.
+    if args.num_proc > 0:
+        num_proc = args.num_proc
+    elif args.cuda:
+        num_proc = min(mp.cpu_count(), _NUM_CUDA_PROC)
+    else:
+        num_proc = mp.cpu_count()
+
+    ctx = mp.get_context("spawn" if args.cuda else None)
+    with ctx.Pool(processes=num_proc) as pool:
         f = functools.partial(convert_record, dataset_name=args.dataset,
                               save_dir=torch_dir, batch_size=args.batch_size,
-                              first_n=args.first_n)
-        pool.map(f, record_list)
+                              first_n=args.first_n, cuda=args.cuda)
+
+        # Send records in chunks to reduce inter-process communication
+        chunksize = max(1, len(record_list) // (num_proc * 4))
+        for _ in tqdm.tqdm(
+                pool.imap_unordered(f, record_list, chunksize=chunksize),
+                total=len(record_list)):
+            pass
 
 
 if __name__ == "__main__":
@@ -46,6 +46,9 @@ class Config:
     train_dir: str
     test_dir: str
 
+    # Optional from config file
+    dataloader_params: dict = dataclasses.field(default_factory=dict)
+
 
 class Trainer:
     """Trainer class for Generative Query Netowork.
@@ -145,11 +148,14 @@ class Trainer:
             train_kwrags.update({"vectorizer": vectorizer, "train": True})
             test_kwargs.update({"vectorizer": vectorizer, "train": False})
 
-        # Params for GPU
-        if torch.cuda.is_available():
-            kwargs = {"num_workers": 0, "pin_memory": True}
-        else:
-            kwargs = {}
+        # Params for data loader, page-locked memory is used only for GPU
+        kwargs = dict(self.config.dataloader_params)
+        if self.device.type != "cuda":
+            kwargs["pin_memory"] = False
+
+        # Shared vectorizer is updated while loading, so use main process
+        if self.config.model == "sgqn":
+            kwargs["num_workers"] = 0
 
         self.train_loader = torch.utils.data.DataLoader(
             dataset(**train_kwrags), shuffle=True, batch_size=1, **kwargs)
@@ -173,12 +179,12 @@ class Trainer:
             for data in dataset:
                 self.model.train()
 
+                # Data to device
+                data = self._to_device(data)
+
                 # Split data into context and query
                 data = partition(*data)
 
-                # Data to device
-                data = (x.to(self.device) for x in data)
-
                 # Pixel variance annealing
                 self.var = next(self.sigma_scheduler) ** 2
                 self.beta = next(self.beta_scheduler)
@@ -240,11 +246,11 @@ class Trainer:
         for dataset in self.test_loader:
             for data in dataset:
                 with torch.no_grad():
+                    # Data to device
+                    data = self._to_device(data)
+
                     # Split data into context and query
                     data = partition(*data)
-
-                    # Data to device
-                    data = (v.to(self.device) for v in data)
                     loss_dict = self.model(*data, self.var, self.beta)
                     loss = loss_dict["loss"]
 
@@ -265,6 +271,25 @@ class Trainer:
         self.logger.debug(
             f"Test loss (steps={self.global_steps}): {loss_logger}")
 
+    def _to_device(self, data: tuple) -> list:
+        """Sends data to device.
+
+        Images stored as uint8 are converted to float in `[0, 1]` on device,
+        so that only uint8 pixels are copied from host.
+
+        Args:
+            data (tuple of torch.Tensor): Tuple of `(images, viewpoints, *)`.
+
+        Returns:
+            data (list of torch.Tensor): Data on device.
+        """
+
+        data = [x.to(self.device, non_blocking=True) for x in data]
+        if data[0].dtype == torch.uint8:
+            data[0] = data[0].to(torch.float32).mul_(1.0 / 255.0)
+
+        return data
+
     def save_checkpoint(self) -> None:
         """Saves trained model and optimizer to checkpoint file.
 
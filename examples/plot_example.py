@@ -26,6 +26,7 @@ def main() -> None:
     # Data
     dataset = gqnlib.SceneDataset(root, 20)
     images, viewpoints = dataset[0][0]
+    images = images.float() / 255
     x_c, v_c, x_q, v_q = gqnlib.partition_scene(images, viewpoints)
 
     # Reconstruct and sample
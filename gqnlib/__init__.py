@@ -8,7 +8,7 @@ from .generation import ConvolutionalDRAW
 from .gqn import GenerativeQueryNetwork
 from .renderer import LatentDistribution, Renderer, DRAWRenderer
 from .representation import Pyramid, Tower, Simple
-from .scene_dataset import SceneDataset, partition_scene
+from .scene_dataset import SceneDataset, partition_scene, transform_viewpoint
 from .scheduler import AnnealingStepLR, Annealer, SigmaAnnealer
 from .slim_dataset import SlimDataset, WordVectorizer, partition_slim
 from .slim_generator import SlimGenerator
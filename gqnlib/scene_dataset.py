@@ -3,13 +3,16 @@
 
 from typing import Tuple, List
 
-import gzip
+import io
 import logging
 import pathlib
 import random
+import zipfile
 
+import numpy as np
 import torch
 from torch import Tensor
+import zstandard as zstd
 
 
 class SceneDataset(torch.utils.data.Dataset):
@@ -17,12 +20,16 @@ class SceneDataset(torch.utils.data.Dataset):
 
     SceneDataset class loads data files at each time accessed by index.
 
-    * This class reads `<index>.pt.gz` file, which includes a list of tuples
-      `(images, viewpoints)`; images size = `(m, h, w, c)`, viewpoints size
-      `(m, v)`, where `m` means sequence length of data.
+    * This class reads zstd compressed `<index>.npz.zst` file, which includes
+      stacked arrays `images` and `viewpoints` in npz format; images size =
+      `(n, m, c, h, w)`, viewpoints size = `(n, m, 7)`, where `m` means
+      sequence length of data. Images are stored and returned as uint8, so
+      they should be converted to float in `[0, 1]` after being sent to
+      device. Viewpoints are expected to be already transformed by
+      `transform_viewpoint` at conversion.
 
     * Original data include too many image-viewpoints pairs, so this class
-      splits the list of tuples to minibatches. Therefore, returned value
+      splits the stacked arrays to minibatches. Therefore, returned value
       is list of tuples `(images, viewpoints)`; images size =
       `(batch_size, m, c, h, w)`, viewpoints size = `(batch_size, m, v)`.
 
@@ -37,7 +44,7 @@ class SceneDataset(torch.utils.data.Dataset):
     def __init__(self, root_dir: str, batch_size: int) -> None:
         super().__init__()
 
-        self.record_list = sorted(pathlib.Path(root_dir).glob("*.pt.gz"))
+        self.record_list = sorted(pathlib.Path(root_dir).glob("*.npz.zst"))
         self.batch_size = batch_size
 
         self.logger = logging.getLogger()
@@ -57,7 +64,7 @@ class SceneDataset(torch.utils.data.Dataset):
     def __getitem__(self, index: int) -> List[Tuple[Tensor, Tensor]]:
         """Loads data file and returns data with specified index.
 
-        * Images: `(batch_size, m, c, h, w)`
+        * Images: `(batch_size, m, c, h, w)`, uint8
         * Viewpoints: `(batch_size, m, v)`
 
         Args:
@@ -70,28 +77,16 @@ class SceneDataset(torch.utils.data.Dataset):
         """
 
         try:
-            with gzip.open(self.record_list[index], "rb") as f:
-                dataset = torch.load(f)
-        except (UnicodeDecodeError, ValueError) as e:
+            with self.record_list[index].open("rb") as f:
+                buf = zstd.ZstdDecompressor().decompress(f.read())
+            with np.load(io.BytesIO(buf)) as dataset:
+                images = torch.from_numpy(dataset["images"])
+                viewpoints = torch.from_numpy(dataset["viewpoints"])
+        except (KeyError, ValueError, zipfile.BadZipFile,
+                zstd.ZstdError) as e:
             self.logger.debug(f"Invalid file {self.record_list[index]}: {e}")
             return []
 
-        # Read list of tuples
-        images_list = []
-        viewpoints_list = []
-        for img, view in dataset:
-            images_list.append(torch.from_numpy(img))
-            viewpoints_list.append(torch.from_numpy(view))
-
-        images = torch.stack(images_list)
-        viewpoints = torch.stack(viewpoints_list)
-
-        # Convert data size: NMHWC -> NMCHW
-        images = images.permute(0, 1, 4, 2, 3)
-
-        # Transform viewpoints
-        viewpoints = transform_viewpoint(viewpoints)
-
         # Trim off extra elements
         batch_num = images.size(0) // self.batch_size
         images = images[:self.batch_size * batch_num]
@@ -126,11 +121,11 @@ def transform_viewpoint(viewpoints: Tensor) -> Tensor:
         converted (torch.Tensor): Transformed viewpoints, size `(num, 7)`.
     """
 
-    pos, tmp = torch.split(viewpoints, 3, dim=-1)
-    y, p = torch.split(tmp, 1, dim=-1)
+    pos, angle = torch.split(viewpoints, 3, dim=-1)
 
-    view = [pos, torch.cos(y), torch.sin(y), torch.cos(p), torch.sin(p)]
-    converted = torch.cat(view, dim=-1)
+    # Interleave: (cos(yaw), sin(yaw), cos(pitch), sin(pitch))
+    trig = torch.stack([torch.cos(angle), torch.sin(angle)], dim=-1)
+    converted = torch.cat([pos, trig.flatten(-2)], dim=-1)
     return converted
 
 
@@ -24,9 +24,9 @@ class AnnealingStepLR(_LRScheduler):
         super().__init__(optimizer)
 
     def get_lr(self):
-        return [max(self.mu_f + (self.mu_i - self.mu_f) *
-                    (1.0 - self.last_epoch / self.n), self.mu_f)
-                for base_lr in self.base_lrs]
+        lr = max(self.mu_f + (self.mu_i - self.mu_f) *
+                 (1.0 - self.last_epoch / self.n), self.mu_f)
+        return [lr] * len(self.base_lrs)
 
 
 class Annealer:
@@ -54,10 +54,11 @@ class Annealer:
 
     def __next__(self) -> float:
         self.t += 1
-        value = max(
-            self.final + (self.init - self.final) * (1 - self.t / self.steps),
-            self.final
-        )
+        if self.t >= self.steps:
+            value = self.final
+        else:
+            value = (self.final
+                     + (self.init - self.final) * (1 - self.t / self.steps))
         self.current = value
 
         return value
@@ -97,12 +98,11 @@ class SigmaAnnealer:
 
         if self.t <= self.pretrain:
             value = self.constant
+        elif self.t >= self.steps - self.pretrain:
+            value = self.final
         else:
-            value = max(
-                (self.final + (self.init - self.final)
-                 * (1 - self.t / (self.steps - self.pretrain))),
-                self.final
-            )
+            value = (self.final + (self.init - self.final)
+                     * (1 - self.t / (self.steps - self.pretrain)))
 
         # Return sigma
         return value
@@ -73,20 +73,19 @@ class SlimGQN(BaseGQN):
         r_c = r_c.view(b, m, *r_dims)
         r_c = r_c.sum(1)
 
-        # Copy representations for query
-        r_c = r_c.repeat_interleave(n, dim=0)
+        # Copy representations for query: (b, *) -> (b*n, *)
+        r_c = r_c.unsqueeze(1).expand(b, n, *r_dims).reshape(b * n, *r_dims)
 
         # Query images by v_q, i.e. reconstruct
         canvas, kl_loss = self.generator(x_q, v_q, r_c)
         kl_loss = kl_loss * beta
 
-        # Reconstruction loss
+        # Reconstruction loss: (b*n, c, h, w) -> (b, n)
         nll_loss = nll_normal(x_q, canvas, x_q.new_ones((1,)) * var,
                               reduce=False)
-        nll_loss = nll_loss.sum([1, 2, 3])
+        nll_loss = nll_loss.view(b, n, *x_dims).sum([2, 3, 4])
 
         # Returned loss
-        nll_loss = nll_loss.view(b, n)
         kl_loss = kl_loss.view(b, n)
         loss_dict = {"loss": nll_loss + kl_loss, "nll_loss": nll_loss,
                      "kl_loss": kl_loss}
@@ -131,7 +130,7 @@ class SlimGQN(BaseGQN):
 
         # Sum over representations: (b, c, h, w)
         r_c = r_c.sum(1)
-        r_c = r_c.repeat_interleave(n, dim=0)
+        r_c = r_c.unsqueeze(1).expand(b, n, *r_dims).reshape(b * n, *r_dims)
 
         # Sample query images
         canvas = self.generator.sample(v_q, r_c)
@@ -3,7 +3,9 @@ from setuptools import setup, find_packages
 
 
 install_requires = [
+    "numpy==1.18.4",
     "torch==1.5.0",
+    "zstandard==0.13.0",
 ]
 
 
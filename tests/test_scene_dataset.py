@@ -1,11 +1,14 @@
 
 import unittest
 
-import gzip
+import io
+import math
 import pathlib
 import tempfile
 
+import numpy as np
 import torch
+import zstandard as zstd
 
 import gqnlib
 
@@ -18,14 +21,12 @@ class TestSceneDataset(unittest.TestCase):
 
     def test_getitem(self):
         # Dummy data
-        imgs = torch.empty(4, 64, 64, 3)
-        tgts = torch.empty(4, 5)
-        data = [(imgs.numpy(), tgts.numpy())] * 10
+        imgs = torch.full((10, 4, 3, 64, 64), 255, dtype=torch.uint8)
+        tgts = torch.empty(10, 4, 7)
+        data = {"images": imgs.numpy(), "viewpoints": tgts.numpy()}
 
         with tempfile.TemporaryDirectory() as root:
-            path = str(pathlib.Path(root, "1.pt.gz"))
-            with gzip.open(path, "wb") as f:
-                torch.save(data, f)
+            _save_zstd(data, pathlib.Path(root, "1.npz.zst"))
 
             # Access data
             dataset = gqnlib.SceneDataset(root, 5)
@@ -36,21 +37,19 @@ class TestSceneDataset(unittest.TestCase):
         frames, viewpoints = data_list[0]
         self.assertTupleEqual(frames.size(), (5, 4, 3, 64, 64))
         self.assertTupleEqual(viewpoints.size(), (5, 4, 7))
+        self.assertEqual(frames.dtype, torch.uint8)
+        self.assertTrue((frames == 255).all())
 
     def test_multiitem(self):
         # Dummy data
-        imgs = torch.empty(4, 64, 64, 3)
-        tgts = torch.empty(4, 5)
-        data = [(imgs.numpy(), tgts.numpy())] * 10
+        imgs = torch.full((10, 4, 3, 64, 64), 255, dtype=torch.uint8)
+        tgts = torch.empty(10, 4, 7)
+        data = {"images": imgs.numpy(), "viewpoints": tgts.numpy()}
 
         with tempfile.TemporaryDirectory() as root:
-            path = str(pathlib.Path(root, "1.pt.gz"))
-            with gzip.open(path, "wb") as f:
-                torch.save(data, f)
+            _save_zstd(data, pathlib.Path(root, "1.npz.zst"))
 
-            path = str(pathlib.Path(root, "2.pt.gz"))
-            with gzip.open(path, "wb") as f:
-                torch.save(data, f)
+            _save_zstd(data, pathlib.Path(root, "2.npz.zst"))
 
             # Access data
             dataset = gqnlib.SceneDataset(root, 5)
@@ -63,6 +62,15 @@ class TestSceneDataset(unittest.TestCase):
         self.assertIsInstance(batch[0][0], torch.Tensor)
         self.assertTupleEqual(batch[0][0].size(), (2, 5, 4, 3, 64, 64))
 
+    def test_transform_viewpoint(self):
+        viewpoints = torch.tensor([[1.0, 2.0, 3.0, 0.0, math.pi / 2]])
+        converted = gqnlib.transform_viewpoint(viewpoints)
+
+        self.assertTupleEqual(converted.size(), (1, 7))
+        self.assertTrue(torch.allclose(
+            converted, torch.tensor([[1.0, 2.0, 3.0, 1.0, 0.0, 0.0, 1.0]]),
+            atol=1e-6))
+
     def test_partition_scene(self):
         # Data
         images = torch.empty(1, 5, 15, 3, 64, 64)
@@ -177,5 +185,12 @@ class TestSceneDataset(unittest.TestCase):
         self.assertTupleEqual(v_q.size(), (5, 2, 7))
 
 
+def _save_zstd(data, path):
+    buf = io.BytesIO()
+    np.savez(buf, **data)
+    with path.open("wb") as f:
+        f.write(zstd.ZstdCompressor().compress(buf.getvalue()))
+
+
 if __name__ == "__main__":
     unittest.main()
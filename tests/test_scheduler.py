@@ -38,6 +38,21 @@ class TestAnnealer(unittest.TestCase):
             self.assertEqual(val, true)
 
 
+class TestSigmaAnnealer(unittest.TestCase):
+
+    def test_iter(self):
+
+        annealer = gqnlib.SigmaAnnealer(2.0, 0.7, 1.0, 20, 5)
+        for i in range(25):
+            t = i + 1
+            val = next(annealer)
+            if t <= 5:
+                true = 1.0
+            else:
+                true = max(0.7 + (2.0 - 0.7) * (1.0 - t / 15), 0.7)
+            self.assertAlmostEqual(val, true)
+
+
 class DummyNet(nn.Module):
     def __init__(self):
         super().__init__()
@@ -1,6 +1,8 @@
 
 import unittest
 
+import math
+
 import torch
 
 import gqnlib
@@ -45,6 +47,27 @@ class TestSlimGQN(unittest.TestCase):
         self.assertGreater(loss_dict["nll_loss"].mean(), 0)
         self.assertGreater(loss_dict["kl_loss"].mean(), 0)
 
+    def test_forward_var(self):
+        d_c = torch.randint(0, 80, (4, 15, 20))
+        v_c = torch.randn(4, 15, 4)
+        x_q = torch.randn(4, 2, 3, 64, 64)
+        v_q = torch.randn(4, 2, 4)
+
+        # Same seed gives same canvas for each variance
+        torch.manual_seed(0)
+        nll_1 = self.model(d_c, v_c, x_q, v_q, var=1.0)["nll_loss"]
+        torch.manual_seed(0)
+        nll_2 = self.model(d_c, v_c, x_q, v_q, var=2.0)["nll_loss"]
+
+        # nll = 0.5 * (N * log(2 * pi * var) + sum((x - mu) ** 2) / var)
+        pixel_num = 3 * 64 * 64
+        sq_err = 2 * nll_1 - pixel_num * math.log(2 * math.pi)
+        true = 0.5 * (pixel_num * math.log(4 * math.pi) + sq_err / 2)
+        self.assertTrue(torch.allclose(nll_2, true, rtol=1e-4))
+
+        # Backward through both graphs
+        (nll_1.mean() + nll_2.mean()).backward()
+
     def test_loss_func(self):
         d_c = torch.randint(0, 80, (4, 15, 20))
         v_c = torch.randn(4, 15, 4)